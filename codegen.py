@@ -0,0 +1,234 @@
+import hashlib
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+from numba import njit
+
+from iq_solver import Board
+from shapes import SHAPES_ALL, ShapeInstance, ShapeTemplate
+
+BOARD_SHAPE = (5, 10)  # 5 rows, 10 columns
+TABLE_PATH = Path(__file__).with_name("iq_fit_table.npz")
+
+
+def table_fingerprint(
+    shapes: list[ShapeTemplate] = SHAPES_ALL,
+    board_shape: tuple[int, int] = BOARD_SHAPE,
+) -> str:
+    """Hash of the board size and every shape's name and layouts."""
+    key = repr(
+        (
+            tuple(board_shape),
+            [
+                (shape.name, [(idx, sorted(layout)) for idx, layout in shape.layouts])
+                for shape in shapes
+            ],
+        )
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def build_table(
+    shapes: list[ShapeTemplate] = SHAPES_ALL,
+    board_shape: tuple[int, int] = BOARD_SHAPE,
+) -> dict[str, np.ndarray]:
+    """Enumerate every in-bounds placement of every shape as a uint64 mask.
+
+    Placements are grouped by their lowest covered cell: the ones anchored at
+    cell i are MASKS[CELL_OFFSETS[i]:CELL_OFFSETS[i + 1]].
+    """
+    n_cells = board_shape[0] * board_shape[1]
+    if n_cells > 64:
+        raise ValueError(f"Board too large for a 64-bit mask: {board_shape}")
+
+    rows = []
+    for piece_idx, shape in enumerate(shapes):
+        for layout, rotation in shape.canonical_orientations():
+            instance = ShapeInstance(shape, layout, rotation)
+            for row in range(board_shape[0]):
+                for col in range(board_shape[1]):
+                    if instance.in_bounds(row, col, board_shape):
+                        mask = instance.mask(row, col, board_shape[1])
+                        anchor = (mask & -mask).bit_length() - 1
+                        rows.append(
+                            (anchor, mask, piece_idx, layout, rotation, row, col)
+                        )
+    rows.sort(key=lambda r: r[0])
+
+    anchors = np.array([r[0] for r in rows], dtype=np.int64)
+    return {
+        "MASKS": np.array([r[1] for r in rows], dtype=np.uint64),
+        "PIECE_IDX": np.array([r[2] for r in rows], dtype=np.int8),
+        "CONFIGS": np.array([r[3:] for r in rows], dtype=np.int16),
+        "CELL_OFFSETS": np.searchsorted(anchors, np.arange(n_cells + 1)),
+        "SHAPE_NAMES": np.array([shape.name for shape in shapes]),
+        "BOARD_SHAPE": np.array(board_shape, dtype=np.int64),
+        "FINGERPRINT": np.array(table_fingerprint(shapes, board_shape)),
+    }
+
+
+def load_table(
+    path: Path = TABLE_PATH,
+    shapes: list[ShapeTemplate] = SHAPES_ALL,
+    board_shape: tuple[int, int] = BOARD_SHAPE,
+) -> dict[str, np.ndarray]:
+    """Load the placement table from disk, generating it on first use.
+
+    The table is rebuilt whenever the shapes or board size it was generated
+    from have changed, including edits to a layout that keep its name.
+    """
+    if path.exists():
+        with np.load(path) as data:
+            table = dict(data)
+        if "FINGERPRINT" in table and str(table["FINGERPRINT"]) == table_fingerprint(
+            shapes, board_shape
+        ):
+            return table
+    table = build_table(shapes, board_shape)
+    np.savez(path, **table)
+    return table
+
+
+@njit(cache=True)
+def solve(
+    masks: np.ndarray,
+    piece_idx: np.ndarray,
+    cell_offsets: np.ndarray,
+    init_mask: np.uint64,
+    init_used: np.int64,
+    target_mask: np.uint64,
+    solutions_out: np.ndarray,
+) -> int:
+    """Depth-first exact cover over the placement masks.
+
+    Always fills the lowest empty cell next, so only the placements anchored
+    at that cell need to be tried. A cover counts only once every piece is
+    used, as in the other solvers. Writes the chosen table rows of each cover
+    into solutions_out (one row per solution, padded with -1) and returns the
+    number of solutions found, at most solutions_out.shape[0].
+    """
+    max_solutions, n_slots = solutions_out.shape
+    one = np.uint64(1)
+    boards = np.zeros(n_slots + 1, dtype=np.uint64)
+    used = np.zeros(n_slots + 1, dtype=np.int64)
+    choice = np.zeros(n_slots, dtype=np.int64)
+    end = np.zeros(n_slots, dtype=np.int64)
+    all_used = (1 << n_slots) - 1
+    n_found = 0
+    if max_solutions == 0:
+        return n_found
+    if init_used == all_used or init_mask == target_mask:
+        # Nothing left to place: the board is its own solution only if complete
+        if init_used == all_used and init_mask == target_mask:
+            solutions_out[0, :] = -1
+            n_found = 1
+        return n_found
+
+    boards[0] = init_mask
+    used[0] = init_used
+    cell = 0
+    while (boards[0] >> np.uint64(cell)) & one:
+        cell += 1
+    choice[0] = cell_offsets[cell] - 1
+    end[0] = cell_offsets[cell + 1]
+    depth = 0
+    while depth >= 0:
+        choice[depth] += 1
+        if choice[depth] >= end[depth]:
+            depth -= 1
+            continue
+        k = choice[depth]
+        piece = np.int64(piece_idx[k])
+        if (used[depth] >> piece) & 1 or boards[depth] & masks[k]:
+            continue
+        board = boards[depth] | masks[k]
+        used_next = used[depth] | (1 << piece)
+        if board == target_mask:
+            if used_next != all_used:
+                continue
+            solutions_out[n_found, :] = -1
+            solutions_out[n_found, : depth + 1] = choice[: depth + 1]
+            n_found += 1
+            if n_found == max_solutions:
+                return n_found
+            continue
+        if used_next == all_used:
+            continue
+        boards[depth + 1] = board
+        used[depth + 1] = used_next
+        cell = 0
+        while (board >> np.uint64(cell)) & one:
+            cell += 1
+        depth += 1
+        choice[depth] = cell_offsets[cell] - 1
+        end[depth] = cell_offsets[cell + 1]
+    return n_found
+
+
+def solve_board(
+    init_board: Board | None = None,
+    max_solutions: int = 5,
+    table: dict[str, np.ndarray] | None = None,
+    shapes: list[ShapeTemplate] = SHAPES_ALL,
+) -> list[Board] | None:
+    """Complete a standard 5x10 board with the specialized kernel.
+
+    table must have been built from shapes; by default it is loaded (or
+    generated) for them.
+    """
+    if table is None:
+        table = load_table(shapes=shapes)
+    if init_board is None:
+        init_board = Board(shape_board=BOARD_SHAPE)
+    if tuple(init_board.shape_board) != tuple(table["BOARD_SHAPE"]):
+        raise ValueError(f"Table is specialized for {tuple(table['BOARD_SHAPE'])}")
+
+    shape_names = [str(name) for name in table["SHAPE_NAMES"]]
+    if shape_names != [shape.name for shape in shapes]:
+        raise ValueError(f"Table was built for other shapes: {shape_names}")
+    shape_name_map = {shape.name: shape for shape in shapes}
+    init_used = 0
+    for _, _, instance in init_board.placements:
+        if instance.template.name in shape_names:
+            init_used |= 1 << shape_names.index(instance.template.name)
+
+    solutions_out = np.full((max_solutions, len(shape_names)), -1, dtype=np.int64)
+    n_found = solve(
+        table["MASKS"],
+        table["PIECE_IDX"],
+        table["CELL_OFFSETS"],
+        np.uint64(init_board.occupied_mask()),
+        np.int64(init_used),
+        np.uint64(init_board.shape_board_bits),
+        solutions_out,
+    )
+
+    solutions = []
+    for chosen in solutions_out[:n_found]:
+        selected_positions = [
+            (
+                shape_names[table["PIECE_IDX"][k]],
+                *(int(v) for v in table["CONFIGS"][k]),
+            )
+            for k in chosen[chosen >= 0]
+        ]
+        solutions.append(init_board.with_placements(selected_positions, shape_name_map))
+
+    if not solutions:
+        return None
+    else:
+        return solutions
+
+
+if __name__ == "__main__":
+    start = perf_counter()
+    solutions = solve_board(max_solutions=1)
+    print(f"first solve (table + JIT): {perf_counter() - start:.3f}s")
+
+    start = perf_counter()
+    solutions = solve_board(max_solutions=100)
+    print(f"100 solutions: {perf_counter() - start:.3f}s")
+    assert solutions is not None
+    print(f"len(solutions): {len(solutions)}")
+    solutions[0].render_mpl()
@@ -1,11 +1,17 @@
+import multiprocessing
+import os
+import signal
 from collections import defaultdict
-from copy import deepcopy
 from dataclasses import dataclass, field
+from functools import partial
 from itertools import product
+from math import prod
 
 import matplotlib.pyplot as plt
+import numpy as np
 import pulp
-from matplotlib.patches import Rectangle
+from matplotlib.colors import to_rgba
+from numba import njit
 
 from shapes import (
     SHAPE_B,
@@ -29,68 +35,95 @@ from shapes import (
 @dataclass
 class Board:
     shape_board: tuple[int, int] = (5, 10)  # 5 rows, 10 columns
-    # placements: dict[tuple[int, int], ShapeInstance] = field(default_factory=dict)
-    placements: dict[tuple[int, int], list[ShapeInstance]] = field(
-        default_factory=lambda: defaultdict(list)
-    )
+    # (base_row, base_col, shape) for every shape placed on the board
+    placements: list[tuple[int, int, ShapeInstance]] = field(default_factory=list)
 
     def fill_grid(self) -> dict[tuple[int, int], str]:
         grid = {}
-        for placement, shapes in self.placements.items():
-            for shape in shapes:
-                grid_shape = shape.fill_grid()
-                for row, col in grid_shape:
-                    if (placement[0] + row, placement[1] + col) not in grid:
-                        grid[(placement[0] + row, placement[1] + col)] = set()
-                    grid[(placement[0] + row, placement[1] + col)].add(
-                        grid_shape[(row, col)]
-                    )
+        for base_row, base_col, shape in self.placements:
+            grid_shape = shape.fill_grid()
+            for row, col in grid_shape:
+                if (base_row + row, base_col + col) not in grid:
+                    grid[(base_row + row, base_col + col)] = set()
+                grid[(base_row + row, base_col + col)].add(grid_shape[(row, col)])
         return grid
 
     def occupied_cells(self) -> list[tuple[int, int]]:
         return sorted(list(self.fill_grid().keys()))
 
+    @property
+    def shape_board_bits(self) -> int:
+        """Bitmask with one bit set for every cell of the board."""
+        return (1 << (self.shape_board[0] * self.shape_board[1])) - 1
+
+    def _occupancy(self) -> tuple[int, int, bool]:
+        """(union mask, cell count) of the in-bounds placements, and any off-board."""
+        # Recomputed on every call: placements is a plain list that callers edit
+        # directly, and one pass over at most a dozen pieces is cheap
+        occupied_mask = nbits = 0
+        out_of_bounds = False
+        for row, col, shape in self.placements:
+            if not shape.in_bounds(row, col, self.shape_board):
+                out_of_bounds = True
+                continue
+            occupied_mask |= shape.mask(row, col, self.shape_board[1])
+            nbits += len(shape.get_current_grid())
+        return occupied_mask, nbits, out_of_bounds
+
+    def occupied_mask(self) -> int:
+        """Bitmask of the cells covered by the in-bounds placements."""
+        return self._occupancy()[0]
+
     def is_valid_placement(self) -> bool:
-        grid = self.fill_grid()
-        for row, col in grid:
-            if len(grid[(row, col)]) > 1:
-                return False
-            if row < 0 or row >= self.shape_board[0]:
-                return False
-            if col < 0 or col >= self.shape_board[1]:
-                return False
-        return True
+        # Any overlap makes the union cover fewer cells than the pieces do
+        occupied_mask, nbits, out_of_bounds = self._occupancy()
+        return not out_of_bounds and occupied_mask.bit_count() == nbits
+
+    def with_placements(
+        self,
+        configs: list[tuple[str, int, int, int, int]],
+        shape_name_map: dict[str, ShapeTemplate],
+    ) -> "Board":
+        """Copy of the board with every (shape, layout, rotation, row, col) placed."""
+        # The board itself is never mutated, so the copy only needs a fresh list
+        new_board = Board(
+            shape_board=self.shape_board, placements=list(self.placements)
+        )
+        for s_name, layout, rotation, row, col in configs:
+            new_board.placements.append(
+                (row, col, ShapeInstance(shape_name_map[s_name], layout, rotation))
+            )
+        return new_board
 
-    def render_mpl(self):
+    def render_mpl(self, annotate: bool = False):
         fig, ax = plt.subplots(1, 1)
         ax.grid(True)
         ax.set_aspect("equal")
+        # One RGBA pixel per cell, drawn as a single image; empty cells stay clear
+        img = np.zeros((self.shape_board[0], self.shape_board[1], 4))
+        for (row, col), shape_set in self.fill_grid().items():
+            if 0 <= row < self.shape_board[0] and 0 <= col < self.shape_board[1]:
+                img[row, col] = to_rgba(get_color(next(iter(shape_set))), alpha=0.5)
+            if annotate:
+                ax.text(col + 0.5, row + 0.5, shape_set, ha="center", va="center")
+        ax.imshow(
+            img,
+            origin="upper",
+            extent=(0, self.shape_board[1], self.shape_board[0], 0),
+            interpolation="nearest",
+        )
         ax.set_xlim(0, self.shape_board[1])
-        ax.set_ylim(0, self.shape_board[0])
+        ax.set_ylim(self.shape_board[0], 0)
         # make increments of 1
         ax.set_xticks(range(self.shape_board[1]))
         ax.set_yticks(range(self.shape_board[0]))
-        for (row, col), shape_set in self.fill_grid().items():
-            for shape in shape_set:
-                ax.add_patch(
-                    Rectangle(
-                        (col, row),
-                        1,
-                        1,
-                        # facecolor=colormap_for_matplotlib[shape],
-                        facecolor=get_color(shape),
-                        alpha=0.5,
-                    )
-                )
-            ax.text(col + 0.5, row + 0.5, shape_set, ha="center", va="center")
-        ax.invert_yaxis()
         fig.tight_layout()
         plt.show()
 
 
 # test_board = Board()
-# test_board.placements[(0, 0)] = ShapeInstance(SHAPE_LG, 1, 90)
-# test_board.placements[(0, 4)] = ShapeInstance(SHAPE_DG, 0, 0)
+# test_board.placements.append((0, 0, ShapeInstance(SHAPE_LG, 1, 90)))
+# test_board.placements.append((0, 4, ShapeInstance(SHAPE_DG, 0, 0)))
 
 # print(test_board.fill_grid())
 
@@ -102,43 +135,91 @@ class Board:
 # only one of each shape can be placed on the board
 
 
+@njit(cache=True)
+def _place_all_shapes(
+    masks: np.ndarray,
+    piece_offsets: np.ndarray,
+    init_mask: np.uint64,
+    choice: np.ndarray,
+) -> bool:
+    """Backtrack over the placement masks until every piece is placed.
+
+    The configurations of piece i are masks[piece_offsets[i]:piece_offsets[i + 1]].
+    On success the chosen mask index of each piece is written to choice.
+    """
+    n_pieces = piece_offsets.shape[0] - 1
+    if n_pieces == 0:
+        return True
+    boards = np.zeros(n_pieces + 1, dtype=np.uint64)
+    boards[0] = init_mask
+    depth = 0
+    choice[0] = piece_offsets[0] - 1
+    while depth >= 0:
+        choice[depth] += 1
+        if choice[depth] >= piece_offsets[depth + 1]:
+            depth -= 1
+            continue
+        mask = masks[choice[depth]]
+        if boards[depth] & mask == 0:
+            boards[depth + 1] = boards[depth] | mask
+            if depth + 1 == n_pieces:
+                return True
+            depth += 1
+            choice[depth] = piece_offsets[depth] - 1
+    return False
+
+
 def brute_force_solver(
     init_board: Board, shapes_to_place: list[ShapeTemplate]
 ) -> Board | None:
+    if init_board.shape_board[0] * init_board.shape_board[1] > 64:
+        raise ValueError(f"Board too large for a 64-bit mask: {init_board.shape_board}")
+
     placement_locations = [
         (row, col)
         for row in range(init_board.shape_board[0])
         for col in range(init_board.shape_board[1])
     ]
-    layouts = [0, 1]
-    rotations = [0, 90, 180, 270]
-
-    single_shape_combo_set = list(product(placement_locations, layouts, rotations))
-    print(f"len(single_shape_combo_set): {len(single_shape_combo_set)}")
-
-    combos_all = list(product(single_shape_combo_set, repeat=len(shapes_to_place)))
-    print(f"len(combos_all): {len(combos_all)}")
-
-    solution_found = False
-    solution = None
 
-    for combo in combos_all:
-        board_trial = deepcopy(init_board)
+    # Orientations with identical footprints would only repeat the same search
+    single_shape_combo_sets = [
+        list(product(placement_locations, shape.canonical_orientations()))
+        for shape in shapes_to_place
+    ]
+    print(f"len(single_shape_combo_sets): {[len(c) for c in single_shape_combo_sets]}")
+    print(f"len(combos_all): {prod(len(c) for c in single_shape_combo_sets)}")
 
-        for shape, combo_part in zip(shapes_to_place, combo):
-            print(f"shape: {shape.name}")
-            placement, layout, rotation = combo_part
-            board_trial.placements[placement].append(
-                ShapeInstance(shape, layout, rotation)
-            )
+    if not init_board.is_valid_placement():
+        print("No solution found.")
+        return None
 
-        if board_trial.is_valid_placement():
-            solution_found = True
-            solution = board_trial
-            break
+    # Flat table of the in-bounds placement masks, grouped by piece
+    masks = []
+    configs = []
+    piece_offsets = [0]
+    for shape, single_shape_combo_set in zip(shapes_to_place, single_shape_combo_sets):
+        for (row, col), (layout, rotation) in single_shape_combo_set:
+            instance = ShapeInstance(shape, layout, rotation)
+            if instance.in_bounds(row, col, init_board.shape_board):
+                masks.append(instance.mask(row, col, init_board.shape_board[1]))
+                configs.append((shape.name, layout, rotation, row, col))
+        piece_offsets.append(len(masks))
+
+    choice = np.full(len(shapes_to_place), -1, dtype=np.int64)
+    solution_found = _place_all_shapes(
+        np.array(masks, dtype=np.uint64),
+        np.array(piece_offsets, dtype=np.int64),
+        np.uint64(init_board.occupied_mask()),
+        choice,
+    )
 
     if solution_found:
-        assert solution is not None
+        selected_positions = [configs[config_idx] for config_idx in choice]
+        for config in selected_positions:
+            print(f"shape: {config[0]}")
+        solution = init_board.with_placements(
+            selected_positions, {shape.name: shape for shape in shapes_to_place}
+        )
         print("Solution found!")
         print(solution.fill_grid())
         return solution
@@ -147,112 +228,75 @@ def brute_force_solver(
         return None
 
 
-def get_occupied_cells(
+def precompute_placements(
     shape_template: ShapeTemplate,
-    layout_idx: int,
-    rotation: int,
-    row: int,
-    col: int,
-) -> list[tuple[int, int]]:
-    board = Board()
-    board.placements[(row, col)].append(
-        ShapeInstance(shape_template, layout_idx, rotation)
-    )
-    grid = board.fill_grid()
-    locs = sorted(list(grid.keys()))
-    return locs
-
-
-def mip_solver(
+    board_shape: tuple[int, int],
+) -> dict[tuple[str, int, int, int, int], frozenset[tuple[int, int]]]:
+    """Map every (shape, layout, rotation, base_row, base_col) to the cells it covers.
+
+    Only one (layout, rotation) per distinct footprint is used. Each rotated
+    layout is looked up once and then translated to every base position;
+    footprints that fall off the board are kept so callers can filter them.
+    """
+    placements = {}
+    for layout_idx, rotation in shape_template.canonical_orientations():
+        offsets = shape_template.layout_rotated_by_idx(layout_idx, rotation)
+        for base_row in range(board_shape[0]):
+            for base_col in range(board_shape[1]):
+                placements[
+                    (shape_template.name, layout_idx, rotation, base_row, base_col)
+                ] = frozenset((base_row + row, base_col + col) for row, col in offsets)
+    return placements
+
+
+def _build_mip(
     init_board: Board,
     shapes_to_place: list[ShapeTemplate],
-    max_solutions: int = 5,
     allow_holes: bool = False,
-) -> list[Board] | None:
-    layout_versions = [0, 1]
-    rotations = [0, 90, 180, 270]
-    shape_name_map = {shape.name: shape for shape in shapes_to_place}
-    shape_names = list(shape_name_map.keys())
+) -> tuple[pulp.LpProblem, dict[tuple[str, int, int, int, int], pulp.LpVariable]]:
+    """Build the placement MIP; x maps (shape, layout, rotation, row, col) to a var."""
+    shape_names = [shape.name for shape in shapes_to_place]
 
     problem = pulp.LpProblem("iq_fit")
 
-    x = pulp.LpVariable.dicts(
-        "x",
-        (
-            shape_names,
-            layout_versions,
-            rotations,
-            range(init_board.shape_board[0]),
-            range(init_board.shape_board[1]),
-        ),
-        cat=pulp.LpBinary,
-    )
-    print(x)
+    # Footprint of every configuration that fits entirely on the board
+    placements = {}
+    for shape in shapes_to_place:
+        for config, cells in precompute_placements(
+            shape, init_board.shape_board
+        ).items():
+            if all(
+                0 <= occupied_row < init_board.shape_board[0]
+                and 0 <= occupied_col < init_board.shape_board[1]
+                for occupied_row, occupied_col in cells
+            ):
+                placements[config] = cells
+
+    # Only in-bounds configurations get a variable, so no bounds constraint is needed.
+    # Short index names avoid PuLP having to sanitize the shape names.
+    x = {
+        config: pulp.LpVariable(f"x{i}", cat=pulp.LpBinary)
+        for i, config in enumerate(placements)
+    }
 
-    # Constraint 1: Each piece must be placed exactly once
+    # Inverse shape -> configurations and cell -> configurations maps, built in one
+    # pass so no constraint below has to scan every configuration
+    shape_to_configs = defaultdict(list)
+    cell_to_configs = defaultdict(list)
+    for config, cells in placements.items():
+        shape_to_configs[config[0]].append(config)
+        for cell in cells:
+            cell_to_configs[cell].append(config)
+
+    # Constraint 1: Each piece must be placed exactly once. Since x is binary this
+    # also implies at most one layout version and one rotation per piece.
     for shape in shape_names:
-        problem += (
-            pulp.lpSum(
-                x[shape][layout][rotation][row][col]
-                for layout in layout_versions
-                for rotation in rotations
-                for row in range(init_board.shape_board[0])
-                for col in range(init_board.shape_board[1])
-            )
-            == 1
+        problem += pulp.LpConstraint(
+            e=pulp.LpAffineExpression({x[c]: 1 for c in shape_to_configs[shape]}),
+            sense=pulp.LpConstraintEQ,
+            rhs=1,
         )
 
-    # Constraint 2: Only one layout version per piece
-    for shape in shape_names:
-        for layout in layout_versions:
-            problem += (
-                pulp.lpSum(
-                    x[shape][layout][rotation][row][col]
-                    for rotation in rotations
-                    for row in range(init_board.shape_board[0])
-                    for col in range(init_board.shape_board[1])
-                )
-                <= 1
-            )
-
-    # Constraint 3: Only one rotation per layout version
-    for shape in shape_names:
-        for layout in layout_versions:
-            for rotation in rotations:
-                problem += (
-                    pulp.lpSum(
-                        x[shape][layout][rotation][row][col]
-                        for row in range(init_board.shape_board[0])
-                        for col in range(init_board.shape_board[1])
-                    )
-                    <= 1
-                )
-
-    # Constraint 4: pieces are in bounds of the board
-    for shape in shape_names:
-        for layout in layout_versions:
-            for rotation in rotations:
-                for row in range(init_board.shape_board[0]):
-                    for col in range(init_board.shape_board[1]):
-                        # Get the real grid points occupied by the piece
-                        occupied_points = get_occupied_cells(
-                            shape_name_map[shape],
-                            layout,
-                            rotation,
-                            row,
-                            col,
-                        )
-
-                        # Check if all occupied points are within bounds
-                        for occupied_row, occupied_col in occupied_points:
-                            if not (
-                                0 <= occupied_row < init_board.shape_board[0]
-                                and 0 <= occupied_col < init_board.shape_board[1]
-                            ):
-                                # If out of bounds, force x = 0 for this configuration
-                                # problem += x[shape, layout, rotation, row, col] == 0
-                                problem += x[shape][layout][rotation][row][col] == 0
-
     # Constraint: Pieces must not overlap
 
     # Define auxiliary variables for grid cell occupancy
@@ -266,7 +310,7 @@ def mip_solver(
         cat=pulp.LpBinary,
     )
 
-    init_board_occupied_cells = init_board.occupied_cells()
+    init_board_occupied_cells = set(init_board.occupied_cells())
     occupied_already = {
         (r, c): 1 if (r, c) in init_board_occupied_cells else 0
         for r in range(init_board.shape_board[0])
@@ -277,33 +321,17 @@ def mip_solver(
     for row in range(init_board.shape_board[0]):
         for col in range(init_board.shape_board[1]):
             # Collect all piece configurations that can occupy cell (row, col)
-            covering_configs = []
-            for shape in shape_names:
-                for layout in layout_versions:
-                    for rotation in rotations:
-                        for base_row in range(init_board.shape_board[0]):
-                            for base_col in range(init_board.shape_board[1]):
-                                # Check if the current configuration covers this cell
-                                if (row, col) in get_occupied_cells(
-                                    shape_name_map[shape],
-                                    layout,
-                                    rotation,
-                                    base_row,
-                                    base_col,  # <-- Fix: pass in the base_row, base_col
-                                ):
-                                    covering_configs.append(
-                                        (shape, layout, rotation, base_row, base_col)
-                                    )
-
-            # Link y[row][col] to the covering configurations
-            problem += (
-                y[row, col]
-                == occupied_already[row, col]
-                + pulp.lpSum(
-                    x[shape][layout][rotation][base_row][base_col]
-                    for shape, layout, rotation, base_row, base_col in covering_configs
-                ),
-                f"Link_y_Cell_{row}_{col}",
+            covering_configs = cell_to_configs[row, col]
+
+            # Link y[row][col] to the covering configurations:
+            # y - sum(x) == occupied_already
+            coefs = {x[config]: -1 for config in covering_configs}
+            coefs[y[row, col]] = 1
+            problem += pulp.LpConstraint(
+                e=pulp.LpAffineExpression(coefs),
+                sense=pulp.LpConstraintEQ,
+                name=f"Link_y_Cell_{row}_{col}",
+                rhs=occupied_already[row, col],
             )
 
     # Ensure no overlaps
@@ -313,6 +341,109 @@ def mip_solver(
             if not allow_holes:
                 problem += y[row, col] == 1, f"MustCover_Cell_{row}_{col}"
 
+    return problem, x
+
+
+def _enumerate_mip_solutions(
+    problem: pulp.LpProblem,
+    x: dict[tuple[str, int, int, int, int], pulp.LpVariable],
+    max_solutions: int,
+    solver: pulp.LpSolver | None = None,
+) -> list[list[tuple[str, int, int, int, int]]]:
+    """Solve repeatedly, cutting off each solution found, until max_solutions."""
+    solutions = []  # Will store the selected configurations of each solution
+    used_solutions_cuts = [  # Will store the "exclude solution" constraints
+        name for name in problem.constraints if name.startswith("Exclude_Solution_")
+    ]
+
+    while len(solutions) < max_solutions:
+        # Solve
+        status = problem.solve(solver)
+
+        # If no more feasible solutions, stop
+        if pulp.LpStatus[status] not in ("Optimal", "Feasible"):
+            break
+
+        # Extract this solution's chosen positions
+        selected_positions = [
+            config for config, var in x.items() if var.varValue and var.varValue > 0.5
+        ]
+        solutions.append(selected_positions)
+
+        # ---- Add a cut to exclude this exact solution ----
+        # We want: sum(x of these chosen positions) <= (len(selected_positions) - 1)
+        # so at least one chosen variable must flip from 1 to 0 in the next solution.
+        cut_name = f"Exclude_Solution_{len(used_solutions_cuts) + 1}"
+        problem += pulp.LpConstraint(
+            e=pulp.LpAffineExpression({x[c]: 1 for c in selected_positions}),
+            sense=pulp.LpConstraintLE,
+            name=cut_name,
+            rhs=len(selected_positions) - 1,
+        )
+
+        used_solutions_cuts.append(cut_name)
+
+    return solutions
+
+
+def _init_mip_worker() -> None:
+    """Give the worker its own process group so stopping it also stops CBC."""
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()
+        # Pool.terminate() sends SIGTERM; take the solver subprocess down too
+        signal.signal(signal.SIGTERM, lambda *_: os.killpg(0, signal.SIGKILL))
+
+
+def _solve_pinned_mip(
+    init_board: Board,
+    shapes_to_place: list[ShapeTemplate],
+    allow_holes: bool,
+    solver: pulp.LpSolver | None,
+    max_solutions: int,
+    subproblem: tuple[
+        tuple[str, int, int, int, int], list[list[tuple[str, int, int, int, int]]]
+    ],
+) -> list[list[tuple[str, int, int, int, int]]]:
+    """Enumerate the solutions that use the pinned configuration, in a worker.
+
+    subproblem is the (pinned configuration, solutions to exclude) pair.
+    """
+    pinned, excluded = subproblem
+    problem, x = _build_mip(init_board, shapes_to_place, allow_holes)
+    problem += x[pinned] == 1, "Pinned"
+    for i, selected_positions in enumerate(excluded):
+        problem += pulp.LpConstraint(
+            e=pulp.LpAffineExpression({x[c]: 1 for c in selected_positions}),
+            sense=pulp.LpConstraintLE,
+            name=f"Exclude_Known_Solution_{i}",
+            rhs=len(selected_positions) - 1,
+        )
+    return _enumerate_mip_solutions(problem, x, max_solutions, solver)
+
+
+def mip_solver(
+    init_board: Board,
+    shapes_to_place: list[ShapeTemplate],
+    max_solutions: int = 5,
+    allow_holes: bool = False,
+    solver: pulp.LpSolver | None = None,
+    max_workers: int | None = None,
+) -> list[Board] | None:
+    """Solve the board as a MIP, enumerating up to max_solutions solutions.
+
+    solver is any PuLP solver, e.g. pulp.HiGHS(); by default PuLP's bundled CBC
+    is used. Further solutions are found serially by cutting off each one in
+    turn. With max_workers > 1 the search after the first solution is instead
+    split on the placement of the first shape and the sub-MIPs are solved in
+    that many processes; the solutions returned then depend on which sub-MIPs
+    finish first. Sub-MIPs still running once enough solutions are found are
+    stopped.
+    """
+    shape_name_map = {shape.name: shape for shape in shapes_to_place}
+
+    problem, x = _build_mip(init_board, shapes_to_place, allow_holes)
+    print(x)
+
     # # Solve the problem
     # status = problem.solve()
 
@@ -325,109 +456,200 @@ def mip_solver(
     #                 for row in range(init_board.shape_board[0]):
     #                     for col in range(init_board.shape_board[1]):
     #                         if x[shape.name][layout][rotation][row][col].varValue == 1:
-    #                             init_board.placements[(row, col)].append(
-    #                                 ShapeInstance(shape, layout, rotation)
+    #                             init_board.placements.append(
+    #                                 (row, col, ShapeInstance(shape, layout, rotation))
     #                             )
     #     return init_board
     # else:
     #     return None
 
-    solutions = []  # Will store boards
-    used_solutions_cuts = []  # Will store the "exclude solution" constraints
+    found = _enumerate_mip_solutions(problem, x, 1, solver)
+
+    if found and max_solutions > 1 and ((max_workers or 1) == 1 or not shapes_to_place):
+        # The first solution is already cut off, so keep enumerating in place.
+        # With no shapes left there is nothing to pin the split on either.
+        found.extend(_enumerate_mip_solutions(problem, x, max_solutions - 1, solver))
+    elif found and max_solutions > 1:
+        # Every other solution either places the first shape like the first one
+        # did (and differs elsewhere) or places it somewhere else
+        first_shape = shapes_to_place[0].name
+        used = next(config for config in found[0] if config[0] == first_shape)
+        subproblems = [(used, found)] + [
+            (config, []) for config in x if config[0] == first_shape and config != used
+        ]
+        solve_pinned = partial(
+            _solve_pinned_mip,
+            init_board,
+            shapes_to_place,
+            allow_holes,
+            solver,
+            max_solutions - 1,
+        )
+        # Leaving the with block terminates the pool, stopping sub-MIPs that are
+        # still queued or running (and their CBC processes) once enough are found
+        with multiprocessing.Pool(max_workers, initializer=_init_mip_worker) as pool:
+            # Most pins are infeasible and finish quickly, so take whichever
+            # sub-MIP is done first instead of waiting on the first pin
+            for sub_solutions in pool.imap_unordered(solve_pinned, subproblems):
+                found.extend(sub_solutions)
+                if len(found) >= max_solutions:
+                    break
+
+    solutions = [  # Will store boards
+        init_board.with_placements(selected_positions, shape_name_map)
+        for selected_positions in found[:max_solutions]
+    ]
 
-    while True:
-        # Solve
-        status = problem.solve()
+    # After enumerating all solutions, return them
+    if not solutions:
+        return None  # No feasible solutions
+    else:
+        return solutions
 
-        # If no more feasible solutions, stop
-        if pulp.LpStatus[status] not in ("Optimal", "Feasible"):
-            break
 
-        # Extract this solution's chosen positions
-        selected_positions = []
-        for shape in shapes_to_place:
-            s_name = shape.name
-            for layout in layout_versions:
-                for rotation in rotations:
-                    for row in range(init_board.shape_board[0]):
-                        for col in range(init_board.shape_board[1]):
-                            val = pulp.value(x[s_name][layout][rotation][row][col])
-                            if abs(val - 1.0) < 1e-6:  # or just == 1
-                                selected_positions.append(
-                                    (s_name, layout, rotation, row, col)
-                                )
-
-        # Build a *copy* of init_board with these new placements
-        # (So you don’t mutate init_board for subsequent solves)
-        # new_board = init_board.copy()  # Or implement your own deep-copy logic
-        new_board = deepcopy(init_board)
-        for s_name, layout, rotation, row, col in selected_positions:
-            new_board.placements[(row, col)].append(
-                ShapeInstance(shape_name_map[s_name], layout, rotation)
-            )
-        solutions.append(new_board)
+def _algorithm_x(
+    columns: dict[object, dict[tuple, None]],
+    rows: dict[tuple, list[object]],
+    primary: list[object],
+    partial: list[tuple],
+):
+    """Knuth's Algorithm X over a dict-of-sets exact cover matrix.
+
+    Yields every set of rows that covers each primary column exactly once and
+    each remaining (secondary) column at most once. The per-column row sets are
+    dicts so the search order is deterministic.
+    """
+    remaining = [c for c in primary if c in columns]
+    if not remaining:
+        yield list(partial)
+        return
+    # Branch on the primary column with the fewest candidate rows
+    column = min(remaining, key=lambda c: len(columns[c]))
+    for row in list(columns[column]):
+        partial.append(row)
+        removed = _select_row(columns, rows, row)
+        yield from _algorithm_x(columns, rows, primary, partial)
+        _deselect_row(columns, rows, row, removed)
+        partial.pop()
+
+
+def _select_row(
+    columns: dict[object, dict[tuple, None]],
+    rows: dict[tuple, list[object]],
+    row: tuple,
+) -> list[dict[tuple, None]]:
+    removed = []
+    for c in rows[row]:
+        for other_row in columns[c]:
+            for other_c in rows[other_row]:
+                if other_c != c:
+                    del columns[other_c][other_row]
+        removed.append(columns.pop(c))
+    return removed
+
+
+def _deselect_row(
+    columns: dict[object, dict[tuple, None]],
+    rows: dict[tuple, list[object]],
+    row: tuple,
+    removed: list[dict[tuple, None]],
+) -> None:
+    for c in reversed(rows[row]):
+        columns[c] = removed.pop()
+        for other_row in columns[c]:
+            for other_c in rows[other_row]:
+                if other_c != c:
+                    columns[other_c][other_row] = None
+
+
+def dlx_solver(
+    init_board: Board,
+    shapes_to_place: list[ShapeTemplate],
+    max_solutions: int = 5,
+    allow_holes: bool = False,
+) -> list[Board] | None:
+    """Solve the board as an exact cover problem instead of a MIP.
+
+    Rows are the in-bounds placements (shape, layout, rotation, row, col) that
+    avoid the cells already occupied on init_board. Columns are one per shape
+    and one per free cell; with allow_holes the cell columns are optional.
+    """
+    shape_name_map = {shape.name: shape for shape in shapes_to_place}
+    init_board_occupied_cells = set(init_board.occupied_cells())
+    free_cells = [
+        (r, c)
+        for r in range(init_board.shape_board[0])
+        for c in range(init_board.shape_board[1])
+        if (r, c) not in init_board_occupied_cells
+    ]
+    free_cell_set = set(free_cells)
+
+    rows = {}
+    for shape in shapes_to_place:
+        for config, cells in precompute_placements(
+            shape, init_board.shape_board
+        ).items():
+            if cells <= free_cell_set:
+                rows[config] = [shape.name, *sorted(cells)]
+
+    columns = {column: {} for column in [*shape_name_map, *free_cells]}
+    for config, row_columns in rows.items():
+        for column in row_columns:
+            columns[column][config] = None
+
+    primary = list(shape_name_map)
+    if not allow_holes:
+        primary += free_cells
+
+    solutions = []
+    for selected_positions in _algorithm_x(columns, rows, primary, []):
+        solutions.append(init_board.with_placements(selected_positions, shape_name_map))
         if len(solutions) >= max_solutions:
             break
 
-        # ---- Add a cut to exclude this exact solution ----
-        # We want: sum(x of these chosen positions) <= (len(selected_positions) - 1)
-        # so at least one chosen variable must flip from 1 to 0 in the next solution.
-        cut_name = f"Exclude_Solution_{len(solutions)}"
-        problem += (
-            (
-                pulp.lpSum(
-                    x[s][l][r][rr][cc] for (s, l, r, rr, cc) in selected_positions
-                )
-                <= len(selected_positions) - 1
-            ),
-            cut_name,
-        )
-
-        used_solutions_cuts.append(cut_name)
-
-    # After enumerating all solutions, return them
     if not solutions:
-        return None  # No feasible solutions
+        return None
     else:
         return solutions
 
 
-test_board = Board()
-# add a light blue shape to initial board
-# test_board.placements[(0, 0)].append(ShapeInstance(SHAPE_LG, 1, 270))
-# test_board.placements[(1, 0)].append(ShapeInstance(SHAPE_DB, 0, 0))
-# test_board.placements[(3, 0)].append(ShapeInstance(SHAPE_B, 1, 90))
-# test_board.placements[(1, 4)].append(ShapeInstance(SHAPE_R, 0, 0))
-# test_board.placements[(0, 4)].append(ShapeInstance(SHAPE_LB, 1, 270))
-# test_board.placements[(0, 7)].append(ShapeInstance(SHAPE_DG, 1, 270))
-# test_board.placements[(2, 6)].append(ShapeInstance(SHAPE_Y, 0, 90))
-# test_board.placements[(2, 5)].append(ShapeInstance(SHAPE_PU, 0, 90))
-
-
-# test_board.placements[(0, 2)].append(ShapeInstance(SHAPE_DG, 0, 90))
-# test_board.placements[(3, 4)].append(ShapeInstance(SHAPE_LB, 1, 90))
-placed_shapes = [
-    # SHAPE_DG,
-    # SHAPE_LB,
-]
-
-test_board.render_mpl()
-
-shapes_to_place = [shape for shape in SHAPES_ALL if shape not in placed_shapes]
-# shapes_to_place = [
-#     ShapeTemplate(
-#         name=f"dark_green_{i}",
-#         layouts={
-#             0: {(0, 1), (1, 0), (1, 1), (2, 1)},
-#             1: {(0, 0), (1, 0), (1, 1), (2, 0), (2, 1)},
-#         },
-#     )
-#     for i in range(0, 10)
-# ]
-
-
-solutions = mip_solver(test_board, shapes_to_place, max_solutions=1, allow_holes=False)
-assert solutions is not None
-print(f"len(solutions): {len(solutions)}")
-for sol in solutions:
-    sol.render_mpl()
+if __name__ == "__main__":
+    test_board = Board()
+    # add a light blue shape to initial board
+    # test_board.placements.append((0, 0, ShapeInstance(SHAPE_LG, 1, 270)))
+    # test_board.placements.append((1, 0, ShapeInstance(SHAPE_DB, 0, 0)))
+    # test_board.placements.append((3, 0, ShapeInstance(SHAPE_B, 1, 90)))
+    # test_board.placements.append((1, 4, ShapeInstance(SHAPE_R, 0, 0)))
+    # test_board.placements.append((0, 4, ShapeInstance(SHAPE_LB, 1, 270)))
+    # test_board.placements.append((0, 7, ShapeInstance(SHAPE_DG, 1, 270)))
+    # test_board.placements.append((2, 6, ShapeInstance(SHAPE_Y, 0, 90)))
+    # test_board.placements.append((2, 5, ShapeInstance(SHAPE_PU, 0, 90)))
+
+    # test_board.placements.append((0, 2, ShapeInstance(SHAPE_DG, 0, 90)))
+    # test_board.placements.append((3, 4, ShapeInstance(SHAPE_LB, 1, 90)))
+    placed_shapes = [
+        # SHAPE_DG,
+        # SHAPE_LB,
+    ]
+
+    test_board.render_mpl()
+
+    shapes_to_place = [shape for shape in SHAPES_ALL if shape not in placed_shapes]
+    # shapes_to_place = [
+    #     ShapeTemplate(
+    #         name=f"dark_green_{i}",
+    #         layouts=(
+    #             (0, frozenset({(0, 1), (1, 0), (1, 1), (2, 1)})),
+    #             (1, frozenset({(0, 0), (1, 0), (1, 1), (2, 0), (2, 1)})),
+    #         ),
+    #     )
+    #     for i in range(0, 10)
+    # ]
+
+    solutions = dlx_solver(
+        test_board, shapes_to_place, max_solutions=1, allow_holes=False
+    )
+    assert solutions is not None
+    print(f"len(solutions): {len(solutions)}")
+    for sol in solutions:
+        sol.render_mpl()
@@ -1,6 +1,19 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import cache
+
+import numpy as np
 
 TPointSet = set[tuple[int, int]]
+# (layout index, point set) pairs, kept as tuples so templates stay hashable
+TLayouts = tuple[tuple[int, frozenset[tuple[int, int]]], ...]
+
+# Row-vector rotation matrices: (row, col) @ M gives the rotated point
+ROTATION_MATRICES = {
+    0: np.array([[1, 0], [0, 1]], dtype=np.int8),
+    90: np.array([[0, -1], [1, 0]], dtype=np.int8),
+    180: np.array([[-1, 0], [0, -1]], dtype=np.int8),
+    270: np.array([[0, 1], [-1, 0]], dtype=np.int8),
+}
 
 
 # @dataclass
@@ -66,9 +79,22 @@ TPointSet = set[tuple[int, int]]
 @dataclass(frozen=True)
 class ShapeTemplate:
     name: str
-    layouts: dict[int, TPointSet]  # Maps layout index to the point set
+    layouts: TLayouts  # Pairs each layout index with its point set
+    # (k, 2) int8 array of each layout's points, in sorted order
+    layouts_np: dict[int, np.ndarray] = field(
+        init=False, repr=False, compare=False, hash=False
+    )
     VALID_ROTATIONS = {0, 90, 180, 270}
 
+    def __post_init__(self) -> None:
+        layouts_np = {}
+        for idx, layout in self.layouts:
+            points = np.array(sorted(layout), dtype=np.int8).reshape(-1, 2)
+            # Read-only like the rest of the template; rotation 0 hands it out as is
+            points.setflags(write=False)
+            layouts_np[idx] = points
+        object.__setattr__(self, "layouts_np", layouts_np)
+
     def layout_rotated(self, layout: TPointSet, rotation: int) -> TPointSet:
         """Compute the rotated layout."""
         if rotation not in self.VALID_ROTATIONS:
@@ -90,13 +116,50 @@ class ShapeTemplate:
         rotated = {(row - min_row, col - min_col) for row, col in rotated}
         return rotated
 
-    def __hash__(self) -> int:
-        return hash(self.name) + hash(
-            frozenset(
-                {k: frozenset(sorted(v)) for k, v in sorted(self.layouts.items())}
-            )
+    def layout_rotated_np(self, layout_idx: int, rotation: int) -> np.ndarray:
+        """Compute the rotated layout as a (k, 2) array with one matrix product."""
+        if rotation not in self.VALID_ROTATIONS:
+            raise ValueError(f"Invalid rotation: {rotation}")
+        points = self.layouts_np[layout_idx]
+        if rotation == 0:
+            return points
+        rotated = points @ ROTATION_MATRICES[rotation]
+        # Normalize back to origin
+        return rotated - rotated.min(axis=0)
+
+    @cache
+    def layout_rotated_by_idx(
+        self, layout_idx: int, rotation: int
+    ) -> frozenset[tuple[int, int]]:
+        """Compute the rotated layout for a layout index, memoized per template."""
+        return frozenset(
+            map(tuple, self.layout_rotated_np(layout_idx, rotation).tolist())
         )
 
+    @cache
+    def canonical_orientations(self) -> tuple[tuple[int, int], ...]:
+        """Get one (layout_idx, rotation) pair per distinct rotated footprint."""
+        seen = set()
+        orientations = []
+        for layout_idx, _ in self.layouts:
+            for rotation in sorted(self.VALID_ROTATIONS):
+                layout = self.layout_rotated_by_idx(layout_idx, rotation)
+                # Rotation 0 returns the layout as given, so normalize here too
+                min_row = min(row for row, _ in layout)
+                min_col = min(col for _, col in layout)
+                footprint = frozenset(
+                    (row - min_row, col - min_col) for row, col in layout
+                )
+                if footprint not in seen:
+                    seen.add(footprint)
+                    orientations.append((layout_idx, rotation))
+        return tuple(orientations)
+
+    @property
+    def layouts_dict(self) -> dict[int, frozenset[tuple[int, int]]]:
+        """Map layout index to the point set."""
+        return dict(self.layouts)
+
     def render_layout(self, layout: TPointSet) -> str:
         """Render a specific layout."""
         min_row = min(row for row, _ in layout)
@@ -116,31 +179,43 @@ class ShapeInstance:
     template: ShapeTemplate
     current_layout: int = 0
     current_rotation: int = 0
+    # Rotated layout, fixed at construction since instances are not re-rotated
+    _grid: frozenset[tuple[int, int]] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._grid = self.template.layout_rotated_by_idx(
+            self.current_layout, self.current_rotation
+        )
 
     def render_current(self) -> str:
         """Render the current state of the shape."""
-        layout = self.template.layouts[self.current_layout]
-        rotated_layout = self.template.layout_rotated(layout, self.current_rotation)
+        rotated_layout = self.get_current_grid()
         return self.template.render_layout(rotated_layout)
 
-    def get_current_grid(self) -> TPointSet:
+    def get_current_grid(self) -> frozenset[tuple[int, int]]:
         """Get the current layout in grid coordinates."""
-        layout = self.template.layouts[self.current_layout]
-        return self.template.layout_rotated(layout, self.current_rotation)
+        return self._grid
+
+    def in_bounds(
+        self, base_row: int, base_col: int, shape_board: tuple[int, int]
+    ) -> bool:
+        """Check if the current layout fits on the board at (base_row, base_col)."""
+        return all(
+            0 <= base_row + row < shape_board[0]
+            and 0 <= base_col + col < shape_board[1]
+            for row, col in self._grid
+        )
+
+    def mask(self, base_row: int, base_col: int, ncols: int) -> int:
+        """Row-major bitmask of the cells covered at (base_row, base_col)."""
+        mask = 0
+        for row, col in self._grid:
+            mask |= 1 << ((base_row + row) * ncols + base_col + col)
+        return mask
 
     def fill_grid(self) -> dict[tuple[int, int], str]:
         """Fill the grid with the current layout."""
-        layout = self.get_current_grid()
-        min_row = min(row for row, _ in layout)
-        min_col = min(col for _, col in layout)
-        max_row = max(row for row, _ in layout)
-        max_col = max(col for _, col in layout)
-        grid = {}
-        for row in range(min_row, max_row + 1):
-            for col in range(min_col, max_col + 1):
-                if (row, col) in layout:
-                    grid[(row, col)] = self.template.name
-        return grid
+        return {cell: self.template.name for cell in sorted(self._grid)}
 
 
 # light green
@@ -153,10 +228,10 @@ class ShapeInstance:
 # X X
 SHAPE_LG = ShapeTemplate(
     name="light_green",
-    layouts={
-        0: {(0, 0), (1, 0), (2, 0), (2, 1)},
-        1: {(0, 0), (0, 1), (1, 1), (2, 0), (2, 1)},
-    },
+    layouts=(
+        (0, frozenset({(0, 0), (1, 0), (2, 0), (2, 1)})),
+        (1, frozenset({(0, 0), (0, 1), (1, 1), (2, 0), (2, 1)})),
+    ),
 )
 
 # dark green
@@ -169,10 +244,10 @@ SHAPE_LG = ShapeTemplate(
 # X X
 SHAPE_DG = ShapeTemplate(
     name="dark_green",
-    layouts={
-        0: {(0, 1), (1, 0), (1, 1), (2, 1)},
-        1: {(0, 0), (1, 0), (1, 1), (2, 0), (2, 1)},
-    },
+    layouts=(
+        (0, frozenset({(0, 1), (1, 0), (1, 1), (2, 1)})),
+        (1, frozenset({(0, 0), (1, 0), (1, 1), (2, 0), (2, 1)})),
+    ),
 )
 
 # dark blue
@@ -185,10 +260,10 @@ SHAPE_DG = ShapeTemplate(
 # X X
 SHAPE_DB = ShapeTemplate(
     name="dark_blue",
-    layouts={
-        0: {(0, 1), (1, 0), (1, 1), (2, 1)},
-        1: {(0, 0), (0, 1), (1, 0), (2, 0), (2, 1)},
-    },
+    layouts=(
+        (0, frozenset({(0, 1), (1, 0), (1, 1), (2, 1)})),
+        (1, frozenset({(0, 0), (0, 1), (1, 0), (2, 0), (2, 1)})),
+    ),
 )
 
 # blue
@@ -203,10 +278,10 @@ SHAPE_DB = ShapeTemplate(
 # X X
 SHAPE_B = ShapeTemplate(
     name="blue",
-    layouts={
-        0: {(0, 0), (1, 0), (2, 0), (3, 0), (3, 1)},
-        1: {(0, 1), (1, 0), (1, 1), (2, 1), (3, 0), (3, 1)},
-    },
+    layouts=(
+        (0, frozenset({(0, 0), (1, 0), (2, 0), (3, 0), (3, 1)})),
+        (1, frozenset({(0, 1), (1, 0), (1, 1), (2, 1), (3, 0), (3, 1)})),
+    ),
 )
 
 # red
@@ -221,10 +296,10 @@ SHAPE_B = ShapeTemplate(
 # X X
 SHAPE_R = ShapeTemplate(
     name="red",
-    layouts={
-        0: {(0, 0), (1, 0), (2, 0), (3, 0), (3, 1)},
-        1: {(0, 0), (0, 1), (1, 1), (2, 1), (3, 0), (3, 1)},
-    },
+    layouts=(
+        (0, frozenset({(0, 0), (1, 0), (2, 0), (3, 0), (3, 1)})),
+        (1, frozenset({(0, 0), (0, 1), (1, 1), (2, 1), (3, 0), (3, 1)})),
+    ),
 )
 
 # light blue
@@ -239,10 +314,10 @@ SHAPE_R = ShapeTemplate(
 # _ X
 SHAPE_LB = ShapeTemplate(
     name="light_blue",
-    layouts={
-        0: {(0, 0), (1, 0), (2, 0), (2, 1), (3, 0)},
-        1: {(0, 1), (1, 0), (1, 1), (2, 0), (2, 1), (3, 1)},
-    },
+    layouts=(
+        (0, frozenset({(0, 0), (1, 0), (2, 0), (2, 1), (3, 0)})),
+        (1, frozenset({(0, 1), (1, 0), (1, 1), (2, 0), (2, 1), (3, 1)})),
+    ),
 )
 
 # orange
@@ -257,10 +332,10 @@ SHAPE_LB = ShapeTemplate(
 # _ X
 SHAPE_O = ShapeTemplate(
     name="orange",
-    layouts={
-        0: {(0, 0), (1, 0), (2, 0), (2, 1), (3, 0)},
-        1: {(0, 0), (0, 1), (1, 1), (2, 0), (2, 1), (3, 1)},
-    },
+    layouts=(
+        (0, frozenset({(0, 0), (1, 0), (2, 0), (2, 1), (3, 0)})),
+        (1, frozenset({(0, 0), (0, 1), (1, 1), (2, 0), (2, 1), (3, 1)})),
+    ),
 )
 
 # yellow
@@ -275,10 +350,10 @@ SHAPE_O = ShapeTemplate(
 # X X
 SHAPE_Y = ShapeTemplate(
     name="yellow",
-    layouts={
-        0: {(0, 0), (0, 1), (1, 0), (2, 0), (3, 0)},
-        1: {(0, 1), (1, 1), (2, 0), (2, 1), (3, 0), (3, 1)},
-    },
+    layouts=(
+        (0, frozenset({(0, 0), (0, 1), (1, 0), (2, 0), (3, 0)})),
+        (1, frozenset({(0, 1), (1, 1), (2, 0), (2, 1), (3, 0), (3, 1)})),
+    ),
 )
 
 # pink
@@ -293,10 +368,10 @@ SHAPE_Y = ShapeTemplate(
 # X X
 SHAPE_P = ShapeTemplate(
     name="pink",
-    layouts={
-        0: {(0, 1), (1, 1), (2, 0), (2, 1), (3, 1)},
-        1: {(0, 0), (1, 0), (2, 0), (2, 1), (3, 0), (3, 1)},
-    },
+    layouts=(
+        (0, frozenset({(0, 1), (1, 1), (2, 0), (2, 1), (3, 1)})),
+        (1, frozenset({(0, 0), (1, 0), (2, 0), (2, 1), (3, 0), (3, 1)})),
+    ),
 )
 
 # purple
@@ -309,10 +384,10 @@ SHAPE_P = ShapeTemplate(
 # X _
 SHAPE_PU = ShapeTemplate(
     name="purple",
-    layouts={
-        0: {(0, 1), (1, 1), (2, 0), (2, 1)},
-        1: {(0, 0), (0, 1), (1, 0), (1, 1), (2, 0)},
-    },
+    layouts=(
+        (0, frozenset({(0, 1), (1, 1), (2, 0), (2, 1)})),
+        (1, frozenset({(0, 0), (0, 1), (1, 0), (1, 1), (2, 0)})),
+    ),
 )
 
 
@@ -354,7 +429,7 @@ def get_color(shape_name: str) -> str:
 if __name__ == "__main__":
     for shape in SHAPES_ALL:
         print(shape.name)
-        for layout_idx, layout in shape.layouts.items():
+        for layout_idx, layout in shape.layouts:
             print(f"Layout {layout_idx}")
             print(shape.render_layout(layout))
             print()